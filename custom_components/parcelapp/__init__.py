@@ -1,20 +1,25 @@
 """ParcelApp integration for Home Assistant."""
-import asyncio
 import logging
-from typing import Optional
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceRegistry, async_get as async_get_device_registry
 
 from .api import ParcelAppAPI
-from .const import DOMAIN, PLATFORMS, DEFAULT_POLL_INTERVAL, MIN_POLL_INTERVAL, DEFAULT_FILTER_MODE
+from .cache import ParcelAppCache
+from .const import (
+    DOMAIN,
+    PLATFORMS,
+    DEFAULT_POLL_INTERVAL,
+    MIN_POLL_INTERVAL,
+    DEFAULT_FILTER_MODE,
+    DEFAULT_REMOVAL_AGE_DAYS,
+)
 from .coordinator import ParcelAppCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
 
-
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up ParcelApp from a config entry."""
     try:
@@ -36,37 +41,59 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             poll_interval = MIN_POLL_INTERVAL
         filter_mode = entry.options.get("filter_mode", DEFAULT_FILTER_MODE)
 
-        api = ParcelAppAPI(api_key)
-        coordinator = ParcelAppCoordinator(
-            hass, api, poll_interval=poll_interval, filter_mode=filter_mode
-        )
+        # Opening the SQLite cache blocks, so do it in the executor
+        cache = await hass.async_add_executor_job(ParcelAppCache)
+        api = ParcelAppAPI(api_key, cache=cache)
+        try:
+            coordinator = ParcelAppCoordinator(
+                hass, api, poll_interval=poll_interval, filter_mode=filter_mode
+            )
 
-        # On setup, try to use cache first if available to minimize API calls
-        if coordinator.cache:
+            # On setup, try to use cache first if available to minimize API calls
+            if coordinator.cache:
+                try:
+                    await hass.async_add_executor_job(
+                        coordinator.cache.prune, DEFAULT_REMOVAL_AGE_DAYS
+                    )
+                    cached_deliveries = await hass.async_add_executor_job(
+                        coordinator.cache.load_deliveries
+                    )
+                    if cached_deliveries:
+                        _LOGGER.info("Using cached deliveries on setup to minimize API calls.")
+                        coordinator._skip_first_request = True
+                except Exception as cache_err:
+                    _LOGGER.warning("Failed to load cache on setup: %s", cache_err)
+
+            # Fetch initial data (will use cache if flag is set)
+            await coordinator.async_config_entry_first_refresh()
+
+            hass.data[DOMAIN][entry.entry_id] = {
+                "coordinator": coordinator,
+                "api": api,
+            }
+
+            # Set up platforms
+            await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        except Exception:
+            # Don't leak the session and cache connection on a failed setup
+            hass.data[DOMAIN].pop(entry.entry_id, None)
             try:
-                cached_deliveries = coordinator.cache.load_deliveries()
-                if cached_deliveries:
-                    _LOGGER.info("Using cached deliveries on setup to minimize API calls.")
-                    coordinator._skip_first_request = True
-            except Exception as cache_err:
-                _LOGGER.warning("Failed to load cache on setup: %s", cache_err)
-
-        # Fetch initial data (will use cache if flag is set)
-        await coordinator.async_config_entry_first_refresh()
-
-        hass.data[DOMAIN][entry.entry_id] = {
-            "coordinator": coordinator,
-            "api": api,
-        }
-
-        # Set up platforms
-        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+                await api.close()
+            except Exception as close_err:
+                _LOGGER.debug("Error closing API session: %s", close_err)
+            raise
 
         # Set up listeners for options updates
         entry.async_on_unload(entry.add_update_listener(async_update_options))
 
-        # Schedule device cleanup task
-        hass.async_create_task(async_cleanup_old_deliveries(hass, entry))
+        # Clean up old deliveries whenever the coordinator refreshes
+        device_registry = async_get_device_registry(hass)
+        _cleanup_now(hass, entry, device_registry)
+        entry.async_on_unload(
+            coordinator.async_add_listener(
+                lambda: _cleanup_now(hass, entry, device_registry)
+            )
+        )
 
         return True
 
@@ -86,6 +113,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 api = entry_data.get("api")
                 if api:
                     try:
+                        # Also closes the cache shared with the coordinator
                         await api.close()
                     except Exception as err:
                         _LOGGER.debug("Error closing API session: %s", err)
@@ -103,61 +131,45 @@ async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -
     await hass.config_entries.async_reload(config_entry.entry_id)
 
 
-async def async_cleanup_old_deliveries(
-    hass: HomeAssistant, config_entry: ConfigEntry
+@callback
+def _cleanup_now(
+    hass: HomeAssistant, config_entry: ConfigEntry, device_registry: DeviceRegistry
 ) -> None:
-    """Clean up old delivered parcels and their devices."""
-    while True:
+    """Remove devices for old delivered parcels after a coordinator update."""
+    entry_data = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    if not entry_data:
+        return
+
+    coordinator: ParcelAppCoordinator = entry_data["coordinator"]
+    if not coordinator.data:
+        return
+
+    # Most refreshes have nothing to remove
+    to_remove = coordinator.data.get("removed_ids")
+    if not to_remove:
+        return
+
+    reg_get = device_registry.async_get_device
+    reg_rm = device_registry.async_remove_device
+
+    # Resolve all devices first, then mutate the registry in one pass.
+    # Registry methods are event-loop callbacks, so they cannot be moved
+    # to executor threads.
+    devices = []
+    for tracking_number in to_remove:
+        device = reg_get(identifiers={(DOMAIN, tracking_number)})
+        if device:
+            _LOGGER.info("Removing old delivered parcel: %s", tracking_number)
+            devices.append((tracking_number, device.id))
+
+    for tracking_number, device_id in devices:
         try:
-            # Check if entry still exists
-            if config_entry.entry_id not in hass.data.get(DOMAIN, {}):
-                _LOGGER.debug("Config entry removed, stopping cleanup task")
-                break
-
-            coordinator: ParcelAppCoordinator = hass.data[DOMAIN][config_entry.entry_id][
-                "coordinator"
-            ]
-            device_registry: DeviceRegistry = async_get_device_registry(hass)
-
-            # Check coordinator data for deliveries marked for removal
-            if coordinator.data:
-                deliveries = coordinator.data.get("deliveries", [])
-
-                for delivery in deliveries:
-                    try:
-                        if delivery.get("should_remove"):
-                            tracking_number = delivery.get("tracking_number")
-                            _LOGGER.info(
-                                "Removing old delivered parcel: %s", tracking_number
-                            )
-
-                            # Find and remove the device
-                            device = device_registry.async_get_device(
-                                identifiers={(
-"parcelapp", tracking_number)}
-                            )
-                            if device:
-                                device_registry.async_remove_device(device.id)
-                                _LOGGER.debug(
-                                    "Removed device for tracking number: %s", tracking_number
-                                )
-                    except Exception as err:
-                        _LOGGER.error(
-                            "Error removing device %s: %s",
-                            delivery.get("tracking_number", "unknown"),
-                            err,
-                        )
-
-            # Wait for the next coordinator update before checking again
-            await coordinator.async_refresh()
-
-        except asyncio.CancelledError:
-            _LOGGER.debug("Cleanup task cancelled")
-            break
+            reg_rm(device_id)
+            _LOGGER.debug("Removed device for tracking number: %s", tracking_number)
         except Exception as err:
-            _LOGGER.error("Error in cleanup task: %s", err, exc_info=True)
-            # Continue running even if there's an error
-            await asyncio.sleep(60)
+            _LOGGER.error(
+                "Error removing device %s: %s", tracking_number or "unknown", err
+            )
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
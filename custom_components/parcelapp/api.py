@@ -1,34 +1,113 @@
 """ParcelApp API client."""
 import aiohttp
+import asyncio
 import logging
+import random
 
-from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Awaitable, Callable, Tuple
 from .cache import ParcelAppCache
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    from json import loads as _json_loads
+
 _LOGGER = logging.getLogger(__name__)
 
 API_BASE_URL = "https://api.parcel.app/external"
 
+# Retry settings for transient failures (full-jitter exponential backoff).
+# RETRY_CAP bounds each delay, so the retry sleeps add up to at most 20s,
+# well below the poll interval; a refresh never holds the fetch lock for long.
+RETRY_ATTEMPTS = 3
+RETRY_BASE = 2.0
+RETRY_CAP = 10.0
+
+# How long a successful deliveries response is served from memory
+DELIVERIES_TTL = 60.0
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _should_retry(status: int, retry_after: Optional[float]) -> bool:
+    """Return True if a response status is worth retrying.
+
+    A 429 is never retried here: every retry costs quota, and the
+    coordinator owns the rate-limit window. Server errors are retried
+    unless they ask for a wait beyond the backoff cap.
+    """
+    if status == 429:
+        return False
+    return status >= 500 and (retry_after is None or retry_after <= RETRY_CAP)
+
 
 class ParcelAppAPI:
     """ParcelApp API client."""
 
-    def __init__(self, api_key: str):
-        """Initialize the API client."""
+    def __init__(self, api_key: str, cache: Optional[ParcelAppCache] = None):
+        """Initialize the API client.
+
+        Pass a cache opened in an executor job when called from the event loop;
+        opening the SQLite database here blocks.
+        """
         self.api_key = api_key
         self.session: Optional[aiohttp.ClientSession] = None
-        self.cache = ParcelAppCache()
+        self.cache = cache if cache is not None else ParcelAppCache()
+        self._etag: Optional[str] = None
+        # Short-lived memo of successful responses, keyed by filter mode
+        self._memo: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._ttl = DELIVERIES_TTL
+        self._fetch_lock = asyncio.Lock()
+        self._session_lock = asyncio.Lock()
 
     async def async_get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        if self.session is not None and not self.session.closed:
+            return self.session
+
+        async with self._session_lock:
+            if self.session is None or self.session.closed:
+                # Keep-alive outlives the poll interval so polls reuse one TLS connection
+                connector = aiohttp.TCPConnector(
+                    limit=2,
+                    limit_per_host=2,
+                    keepalive_timeout=600,
+                    ttl_dns_cache=3600,
+                    enable_cleanup_closed=True,
+                )
+                self.session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=15, connect=5),
+                    headers=self._get_headers(),
+                )
+            return self.session
 
     async def close(self):
-        """Close the aiohttp session."""
+        """Close the aiohttp session and the cache connection."""
         if self.session and not self.session.closed:
             await self.session.close()
+        await asyncio.get_running_loop().run_in_executor(None, self.cache.close)
+
+    def clear_etag(self):
+        """Forget the last ETag so the next request fetches a full response."""
+        self._etag = None
 
     def _get_headers(self) -> Dict[str, str]:
         """Get request headers with API key."""
@@ -37,65 +116,136 @@ class ParcelAppAPI:
             "Content-Type": "application/json",
         }
 
+    async def _retry_with_backoff(
+        self, request: Callable[[], Awaitable[Tuple[int, Any, Optional[float]]]]
+    ) -> Tuple[int, Any, Optional[float]]:
+        """Run a request, retrying transient failures with full-jitter backoff.
+
+        The request returns (status, body, retry_after). Connection errors and
+        timeouts are retried as well and re-raised after the last attempt.
+        """
+        for attempt in range(RETRY_ATTEMPTS):
+            last_attempt = attempt == RETRY_ATTEMPTS - 1
+            retry_after = None
+            try:
+                status, body, retry_after = await request()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                if last_attempt:
+                    raise
+                _LOGGER.debug("Request failed: %s", err)
+            else:
+                if last_attempt or not _should_retry(status, retry_after):
+                    return status, body, retry_after
+
+            delay = random.uniform(0, min(RETRY_CAP, RETRY_BASE**attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            _LOGGER.debug(
+                "Retrying request in %.1f seconds (attempt %d of %d)",
+                delay,
+                attempt + 2,
+                RETRY_ATTEMPTS,
+            )
+            await asyncio.sleep(delay)
+
     async def get_deliveries(
-        self, filter_mode: str = "recent"
+        self, filter_mode: str = "recent", cache_fallback: bool = True
+    ) -> Dict[str, Any]:
+        """Get deliveries from ParcelApp API, with local cache fallback.
+
+        Successful responses are served from memory for a short TTL, and
+        concurrent callers share a single in-flight request. Pass
+        cache_fallback=False to get errors back instead of cached deliveries
+        (the coordinator does its own fallback). A 429 is always returned as
+        a rate-limit error carrying retry_after when the server sent one.
+        """
+        async with self._fetch_lock:
+            loop = asyncio.get_running_loop()
+            memo = self._memo.get(filter_mode)
+            if memo is not None and loop.time() - memo[0] < self._ttl:
+                _LOGGER.debug("Serving deliveries from memory")
+                return memo[1]
+
+            result = await self._fetch_deliveries(filter_mode, cache_fallback)
+            if result.get("not_modified"):
+                return result
+            if result.get("success") and not result.get("cached"):
+                self._memo[filter_mode] = (loop.time(), result)
+            else:
+                self._memo.pop(filter_mode, None)
+            return result
+
+    async def _fetch_deliveries(
+        self, filter_mode: str, cache_fallback: bool = True
     ) -> Dict[str, Any]:
-        """Get deliveries from ParcelApp API, with local cache fallback."""
+        """Fetch deliveries over HTTP, with optional local cache fallback."""
+
+        async def _error(message: str, reason: str) -> Dict[str, Any]:
+            if cache_fallback:
+                cached = await self.cache.async_load()
+                if cached:
+                    _LOGGER.info("Using cached deliveries due to %s.", reason)
+                    return {"success": True, "deliveries": cached, "cached": True}
+            return {"success": False, "error_message": message}
+
         try:
             session = await self.async_get_session()
             url = f"{API_BASE_URL}/deliveries/?filter_mode={filter_mode}"
 
-            async with session.get(url, headers=self._get_headers()) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    _LOGGER.debug("API response: %s", data)
-                    # Save to cache if successful
-                    if data.get("success") and "deliveries" in data:
-                        self.cache.save_deliveries(data["deliveries"])
-                    return data
-                elif resp.status == 429:
-                    # Rate limited
-                    error_text = await resp.text()
-                    _LOGGER.warning(
-                        "API rate limited (429). Response: %s", error_text
+            headers = {"If-None-Match": self._etag} if self._etag else None
+            etag: Optional[str] = None
+
+            async def _request() -> Tuple[int, Any, Optional[float]]:
+                nonlocal etag
+                async with session.get(url, headers=headers) as resp:
+                    if resp.status == 200:
+                        body = await resp.json(loads=_json_loads)
+                        etag = resp.headers.get("ETag")
+                        return resp.status, body, None
+                    return (
+                        resp.status,
+                        await resp.text(),
+                        _parse_retry_after(resp.headers.get("Retry-After")),
                     )
-                    # Fallback to cache
-                    cached = self.cache.load_deliveries()
-                    if cached:
-                        _LOGGER.info("Using cached deliveries due to rate limit.")
-                        return {"success": True, "deliveries": cached, "cached": True}
-                    return {
-                        "success": False,
-                        "error_message": "You were rate limited, please do not send more than 20 requests per hour.",
-                    }
+
+            status, body, retry_after = await self._retry_with_backoff(_request)
+
+            if status == 304:
+                _LOGGER.debug("Deliveries not modified since last request")
+                return {"success": True, "not_modified": True}
+            if status == 200:
+                data = body
+                _LOGGER.debug("API response: %s", data)
+                # Only a usable payload may be answered with a 304 later
+                if data.get("success") and "deliveries" in data:
+                    self._etag = etag
+                    # Save to cache if successful
+                    await self.cache.async_save(data["deliveries"])
                 else:
-                    error_text = await resp.text()
-                    _LOGGER.error(
-                        "API request failed with status %s: %s", resp.status, error_text
-                    )
-                    # Fallback to cache
-                    cached = self.cache.load_deliveries()
-                    if cached:
-                        _LOGGER.info("Using cached deliveries due to API error.")
-                        return {"success": True, "deliveries": cached, "cached": True}
-                    return {
-                        "success": False,
-                        "error_message": f"HTTP {resp.status}",
-                    }
+                    self._etag = None
+                return data
+            elif status == 429:
+                # Rate limited; the caller decides how to wait and what to show
+                _LOGGER.warning("API rate limited (429). Response: %s", body)
+                result = {
+                    "success": False,
+                    "rate_limited": True,
+                    "error_message": "You were rate limited, please do not send more than 20 requests per hour.",
+                }
+                if retry_after is not None:
+                    result["retry_after"] = int(retry_after)
+                return result
+            else:
+                _LOGGER.error(
+                    "API request failed with status %s: %s", status, body
+                )
+                return await _error(f"HTTP {status}", "API error")
         except aiohttp.ClientError as err:
-            _LOGGER.error(f"API request failed: {err}")
-            cached = self.cache.load_deliveries()
-            if cached:
-                _LOGGER.info("Using cached deliveries due to client error.")
-                return {"success": True, "deliveries": cached, "cached": True}
-            return {"success": False, "error_message": str(err)}
+            _LOGGER.error("API request failed: %s", err)
+            return await _error(str(err), "client error")
         except Exception as err:
-            _LOGGER.error(f"Unexpected error: {err}")
-            cached = self.cache.load_deliveries()
-            if cached:
-                _LOGGER.info("Using cached deliveries due to unexpected error.")
-                return {"success": True, "deliveries": cached, "cached": True}
-            return {"success": False, "error_message": str(err)}
+            _LOGGER.error("Unexpected error: %s", err)
+            return await _error(str(err), "unexpected error")
 
     async def add_delivery(
         self,
@@ -129,24 +279,24 @@ class ParcelAppAPI:
                 "send_push_confirmation": send_push_confirmation,
             }
 
-            async with session.post(
-                url, headers=self._get_headers(), json=payload
-            ) as resp:
+            async with session.post(url, json=payload) as resp:
                 if resp.status == 200:
-                    data = await resp.json()
-                    _LOGGER.debug(f"Add delivery response: {data}")
+                    data = await resp.json(loads=_json_loads)
+                    _LOGGER.debug("Add delivery response: %s", data)
                     return data
                 else:
                     _LOGGER.error(
-                        f"Add delivery failed with status {resp.status}: {await resp.text()}"
+                        "Add delivery failed with status %s: %s",
+                        resp.status,
+                        await resp.text(),
                     )
                     return {
                         "success": False,
                         "error_message": f"HTTP {resp.status}",
                     }
         except aiohttp.ClientError as err:
-            _LOGGER.error(f"Add delivery request failed: {err}")
+            _LOGGER.error("Add delivery request failed: %s", err)
             return {"success": False, "error_message": str(err)}
         except Exception as err:
-            _LOGGER.error(f"Unexpected error: {err}")
+            _LOGGER.error("Unexpected error: %s", err)
             return {"success": False, "error_message": str(err)}
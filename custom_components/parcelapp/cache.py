@@ -1,77 +1,155 @@
+import asyncio
 import sqlite3
 import json
 import os
 import logging
+import threading
 from typing import List, Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
 _LOGGER = logging.getLogger(__name__)
 
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+else:
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+    _loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
+# Delivery fields the integration reads back; anything else is not persisted
+_PERSIST_FIELDS = frozenset(
+    {
+        "tracking_number",
+        "carrier_code",
+        "description",
+        "status_code",
+        "date_expected",
+        "date_expected_end",
+        "events",
+        "extra_information",
+        "timestamp_expected",
+        "timestamp_expected_end",
+    }
+)
+
 CACHE_DB = os.path.join(os.path.dirname(__file__), "parcelapp_cache.sqlite3")
 
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS deliveries (
     id TEXT PRIMARY KEY,
-    data TEXT NOT NULL,
+    data BLOB NOT NULL,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 """
 
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_updated_at ON deliveries (updated_at);
+"""
+
+UPSERT_SQL = """
+INSERT INTO deliveries (id, data) VALUES (?, ?)
+ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = CURRENT_TIMESTAMP
+"""
+
 class ParcelAppCache:
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        connection: Optional[sqlite3.Connection] = None,
+    ):
+        """Open the cache at db_path (":memory:" works) or on a live connection.
+
+        A connection passed in is borrowed: close() leaves it open for the caller
+        and its pragmas are left alone. It must be in autocommit mode
+        (isolation_level=None), since save_deliveries manages its own transaction.
+        """
         self.db_path = db_path or CACHE_DB
+        self._conn: Optional[sqlite3.Connection] = connection
+        self._owns_conn = connection is None
+        # Serializes access to the shared connection from executor threads
+        self._lock = threading.Lock()
         self._ensure_db()
 
     def _ensure_db(self):
-        """Ensure cache database exists and is initialized."""
+        """Open the persistent connection and initialize the cache database."""
         try:
-            with sqlite3.connect(self.db_path, timeout=5.0) as conn:
-                conn.execute(CREATE_TABLE_SQL)
-                conn.commit()
+            if self._conn is None:
+                self._conn = sqlite3.connect(
+                    self.db_path,
+                    timeout=5.0,
+                    check_same_thread=False,
+                    isolation_level=None,
+                )
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn.execute(CREATE_TABLE_SQL)
+            self._conn.execute(CREATE_INDEX_SQL)
         except sqlite3.Error as db_err:
             _LOGGER.error("Failed to initialize cache database: %s", db_err)
+            self.close()
             raise
 
     def save_deliveries(self, deliveries: List[Dict[str, Any]]):
         """Save deliveries to cache database."""
         if not deliveries:
             return
-        
+
+        rows = []
+        for delivery in deliveries:
+            tracking_number = delivery.get("tracking_number")
+            if not tracking_number:
+                _LOGGER.warning("Skipping delivery without tracking number")
+                continue
+
+            try:
+                data = {k: v for k, v in delivery.items() if k in _PERSIST_FIELDS}
+                rows.append((tracking_number, _dumps(data)))
+            except (TypeError, ValueError) as json_err:
+                _LOGGER.error("Failed to serialize delivery %s: %s", tracking_number, json_err)
+                continue
+
+        if not rows:
+            return
+
         try:
-            with sqlite3.connect(self.db_path, timeout=5.0) as conn:
-                for delivery in deliveries:
-                    tracking_number = delivery.get("tracking_number")
-                    if not tracking_number:
-                        _LOGGER.warning("Skipping delivery without tracking number")
-                        continue
-                    
-                    try:
-                        data_json = json.dumps(delivery)
-                        conn.execute(
-                            "REPLACE INTO deliveries (id, data) VALUES (?, ?)",
-                            (tracking_number, data_json),
-                        )
-                    except (json.JSONEncodeError, TypeError) as json_err:
-                        _LOGGER.error("Failed to serialize delivery %s: %s", tracking_number, json_err)
-                        continue
-                
-                conn.commit()
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(UPSERT_SQL, rows)
+                    conn.execute("COMMIT")
+                finally:
+                    # Also covers a failed COMMIT (e.g. database busy), which
+                    # would otherwise leave the transaction and write lock open
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
         except sqlite3.Error as db_err:
             _LOGGER.error("Failed to save deliveries to cache: %s", db_err)
 
     def load_deliveries(self) -> List[Dict[str, Any]]:
         """Load deliveries from cache database."""
         try:
-            with sqlite3.connect(self.db_path, timeout=5.0) as conn:
-                cur = conn.execute("SELECT data FROM deliveries")
-                deliveries = []
-                for row in cur.fetchall():
-                    try:
-                        delivery = json.loads(row[0])
-                        deliveries.append(delivery)
-                    except json.JSONDecodeError as json_err:
-                        _LOGGER.error("Failed to parse cached delivery: %s", json_err)
-                        continue
-                return deliveries
+            with self._lock:
+                rows = self._connection().execute("SELECT data FROM deliveries").fetchall()
+            deliveries = []
+            for row in rows:
+                try:
+                    delivery = _loads(row[0])
+                    deliveries.append(delivery)
+                except _JSONDecodeError as json_err:
+                    _LOGGER.error("Failed to parse cached delivery: %s", json_err)
+                    continue
+            return deliveries
         except sqlite3.Error as db_err:
             _LOGGER.error("Failed to load deliveries from cache: %s", db_err)
             return []
@@ -79,8 +157,50 @@ class ParcelAppCache:
     def clear(self):
         """Clear all cached deliveries."""
         try:
-            with sqlite3.connect(self.db_path, timeout=5.0) as conn:
-                conn.execute("DELETE FROM deliveries")
-                conn.commit()
+            with self._lock:
+                self._connection().execute("DELETE FROM deliveries")
         except sqlite3.Error as db_err:
             _LOGGER.error("Failed to clear cache: %s", db_err)
+
+    def prune(self, days: int):
+        """Remove cached deliveries not updated in the last `days` days."""
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "DELETE FROM deliveries WHERE updated_at < datetime('now', ?)",
+                    (f"-{days} days",),
+                )
+        except sqlite3.Error as db_err:
+            _LOGGER.error("Failed to prune cache: %s", db_err)
+
+    def close(self):
+        """Close the cache database connection."""
+        with self._lock:
+            if self._conn is not None and self._owns_conn:
+                try:
+                    self._conn.close()
+                except sqlite3.Error as db_err:
+                    _LOGGER.debug("Error closing cache database: %s", db_err)
+            self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the open connection, or raise if the cache was closed."""
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed cache")
+        return self._conn
+
+    async def async_save(self, deliveries: List[Dict[str, Any]]):
+        """Save deliveries to cache database in an executor thread."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.save_deliveries, list(deliveries)
+        )
+
+    async def async_load(self) -> List[Dict[str, Any]]:
+        """Load deliveries from cache database in an executor thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.load_deliveries
+        )
+
+    async def async_clear(self):
+        """Clear all cached deliveries in an executor thread."""
+        await asyncio.get_running_loop().run_in_executor(None, self.clear)
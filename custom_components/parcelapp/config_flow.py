@@ -1,37 +1,48 @@
 """Config flow for ParcelApp integration."""
+import functools
 import logging
 from typing import Any, Dict, Optional
 
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_API_KEY
-from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 
 from .api import ParcelAppAPI
+from .cache import ParcelAppCache
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
+_FILTER_MODES = ("active", "recent")
+
 CONFIG_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_API_KEY): str,
         vol.Optional("poll_interval", default=300): int,
-        vol.Optional("filter_mode", default="active"): vol.In(["active", "recent"]),
+        vol.Optional("filter_mode", default="active"): vol.In(_FILTER_MODES),
     }
 )
 
 
-async def validate_api_key(hass: HomeAssistant, api_key: str) -> bool:
+@functools.cache
+def _build_options_schema(poll_interval: int, filter_mode: str) -> vol.Schema:
+    """Build the options schema for the given defaults (cached per defaults)."""
+    return vol.Schema(
+        {
+            vol.Optional("poll_interval", default=poll_interval): int,
+            vol.Optional("filter_mode", default=filter_mode): vol.In(_FILTER_MODES),
+        }
+    )
+
+
+async def validate_api_key(api: ParcelAppAPI) -> bool:
     """Validate the API key by making a test request."""
-    api = ParcelAppAPI(api_key)
     try:
         result = await api.get_deliveries()
-        await api.close()
         return result.get("success", False)
     except Exception as err:
-        _LOGGER.error(f"Error validating API key: {err}")
-        await api.close()
+        _LOGGER.error("Error validating API key: %s", err)
         return False
 
 
@@ -54,8 +65,17 @@ class ParcelAppConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             api_key = user_input.get(CONF_API_KEY)
 
+            # Throwaway client with an in-memory cache, so validation never
+            # touches (or falls back to) the integration's cache file
+            cache = await self.hass.async_add_executor_job(ParcelAppCache, ":memory:")
+            api = ParcelAppAPI(api_key, cache=cache)
+            try:
+                valid = await validate_api_key(api)
+            finally:
+                await api.close()
+
             # Validate API key
-            if not await validate_api_key(self.hass, api_key):
+            if not valid:
                 errors["base"] = "invalid_auth"
             else:
                 return self.async_create_entry(
@@ -95,17 +115,9 @@ class ParcelAppOptionsFlow(config_entries.OptionsFlow):
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
 
-        options_schema = vol.Schema(
-            {
-                vol.Optional(
-                    "poll_interval",
-                    default=self.config_entry.options.get("poll_interval", 300),
-                ): int,
-                vol.Optional(
-                    "filter_mode",
-                    default=self.config_entry.options.get("filter_mode", "active"),
-                ): vol.In(["active", "recent"]),
-            }
+        options_schema = _build_options_schema(
+            self.config_entry.options.get("poll_interval", 300),
+            self.config_entry.options.get("filter_mode", "active"),
         )
 
         return self.async_show_form(step_id="init", data_schema=options_schema)
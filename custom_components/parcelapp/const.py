@@ -1,4 +1,6 @@
 """Constants for ParcelApp integration."""
+from types import MappingProxyType
+from typing import Any
 
 DOMAIN = "parcelapp"
 PLATFORMS = ["sensor"]
@@ -9,15 +11,23 @@ MIN_POLL_INTERVAL = 360  # Minimum 6 minutes to stay within API limits
 DEFAULT_FILTER_MODE = "active"
 DEFAULT_REMOVAL_AGE_DAYS = 3
 
-# Status code mappings
-DELIVERY_STATUS_CODES = {
-    0: "completed",
-    1: "frozen",
-    2: "in_transit",
-    3: "awaiting_pickup",
-    4: "out_for_delivery",
-    5: "not_found",
-    6: "failed_attempt",
-    7: "exception",
-    8: "carrier_info_received",
-}
+# Status code mappings (status codes are contiguous, so index by code)
+DELIVERY_STATUS_TUPLE = (
+    "completed",
+    "frozen",
+    "in_transit",
+    "awaiting_pickup",
+    "out_for_delivery",
+    "not_found",
+    "failed_attempt",
+    "exception",
+    "carrier_info_received",
+)
+DELIVERY_STATUS_CODES = MappingProxyType(dict(enumerate(DELIVERY_STATUS_TUPLE)))
+
+
+def status_name(code: Any) -> str:
+    """Return the status name for a delivery status code."""
+    if isinstance(code, int) and 0 <= code < len(DELIVERY_STATUS_TUPLE):
+        return DELIVERY_STATUS_TUPLE[code]
+    return "unknown"
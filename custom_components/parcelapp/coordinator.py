@@ -1,28 +1,110 @@
 """Update coordinator for ParcelApp integration."""
+import asyncio
 import logging
+import random
+import re
+import sys
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
 
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .api import ParcelAppAPI
-from .cache import ParcelAppCache
-from .const import DEFAULT_REMOVAL_AGE_DAYS
+from .const import DEFAULT_REMOVAL_AGE_DAYS, status_name
 
 _LOGGER = logging.getLogger(__name__)
 
-DELIVERY_STATUS_CODES = {
-    0: "completed",
-    1: "frozen",
-    2: "in_transit",
-    3: "awaiting_pickup",
-    4: "out_for_delivery",
-    5: "not_found",
-    6: "failed_attempt",
-    7: "exception",
-    8: "carrier_info_received",
-}
+# Format of date_expected, e.g. "2025-12-06 00:00:00"
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+_EVENT_FIELDS = ("event", "date", "location", "additional")
+# Attributes added only when the delivery has a truthy value for them
+_OPTIONAL_ATTRIBUTES = (
+    "date_expected_end",
+    "extra_information",
+    "timestamp_expected",
+    "timestamp_expected_end",
+)
+
+
+@dataclass(slots=True)
+class Delivery:
+    """A processed ParcelApp delivery."""
+
+    tracking_number: Optional[str]
+    carrier_code: Optional[str]
+    description: Optional[str]
+    status_code: Optional[int]
+    status_name: str
+    date_expected: Optional[str]
+    date_expected_end: Optional[str]
+    events: List[Dict[str, Any]]
+    extra_information: Optional[str]
+    timestamp_expected: Optional[int] = None
+    timestamp_expected_end: Optional[int] = None
+    # Sensor state attributes, built once per refresh
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_api(cls, delivery: Dict[str, Any]) -> "Delivery":
+        """Create a delivery from a raw API (or cached) delivery dict."""
+        get = delivery.get
+        status_code = get("status_code")
+        tracking_number = get("tracking_number")
+        if isinstance(tracking_number, str):
+            # Interned so sensor lookups compare by identity
+            tracking_number = sys.intern(tracking_number)
+        return cls(
+            tracking_number=tracking_number,
+            carrier_code=get("carrier_code"),
+            description=get("description"),
+            status_code=status_code,
+            status_name=status_name(status_code),
+            date_expected=get("date_expected"),
+            date_expected_end=get("date_expected_end"),
+            events=get("events", []),
+            extra_information=get("extra_information"),
+            timestamp_expected=get("timestamp_expected"),
+            timestamp_expected_end=get("timestamp_expected_end"),
+        )
+
+
+def _build_attributes(delivery: Delivery) -> Dict[str, Any]:
+    """Build the sensor state attributes for a processed delivery."""
+    # Get the most recent event
+    events = delivery.events
+    latest_event = None
+    if events and isinstance(events, list) and isinstance(events[0], dict):
+        event = events[0]
+        latest_event = {k: event.get(k) for k in _EVENT_FIELDS}
+
+    attributes = {
+        "tracking_number": delivery.tracking_number,
+        "carrier": delivery.carrier_code,
+        "description": delivery.description,
+        "status_code": delivery.status_code,
+        "date_expected": delivery.date_expected,
+        "latest_event": latest_event,
+    }
+
+    # Add optional fields if present
+    for key in _OPTIONAL_ATTRIBUTES:
+        value = getattr(delivery, key)
+        if value:
+            attributes[key] = value
+
+    return attributes
+
+
+def _is_rate_limited(result: Dict[str, Any]) -> bool:
+    """Return True if a failed API result is a rate-limit (HTTP 429) error."""
+    if result.get("rate_limited"):
+        return True
+    error_msg = result.get("error_message", "")
+    return "rate limit" in error_msg.lower() or "429" in error_msg
 
 
 class ParcelAppCoordinator(DataUpdateCoordinator):
@@ -45,246 +127,270 @@ class ParcelAppCoordinator(DataUpdateCoordinator):
         self.api = api
         self.filter_mode = filter_mode
         self.hass = hass
-        
-        # Initialize cache with error handling
-        try:
-            self.cache = ParcelAppCache()
-        except Exception as cache_err:
-            _LOGGER.error("Failed to initialize cache: %s. Caching will be disabled.", cache_err)
-            self.cache = None
-        
+        # Share the API client's cache rather than opening a second connection
+        self.cache = api.cache
+
         self._skip_first_request = False  # Flag to skip API call on first refresh if cache exists
+        self._date_cache: Dict[str, datetime] = {}  # Parsed date_expected values
+        self._last_processed: Optional[Dict[str, Any]] = None  # Last known-good data for fallback
         
         # Rate limit handling
         self._rate_limited: bool = False  # Whether we're currently rate limited
-        self._rate_limit_until: Optional[datetime] = None  # When rate limit should expire
-        self._probe_in_progress: bool = False  # Prevent multiple probe requests
+        self._rate_limit_until_monotonic: float = 0.0  # time.monotonic() when rate limit should expire
+        self._probe_lock = asyncio.Lock()  # Serializes rate-limit probe requests
+        # Decorrelated-jitter backoff between rate-limit probes (seconds)
+        self._backoff_base: float = 60.0
+        self._backoff_current: float = self._backoff_base
+        self._backoff_cap: float = 3600.0
 
     async def _async_update_data(self) -> Dict[str, Any]:
         """Fetch data from the API, using cache as fallback."""
         try:
             # Check if we're rate limited and still within the wait period
-            if self._rate_limited and self._rate_limit_until:
-                now = datetime.now()
+            if self._rate_limited:
+                now = time.monotonic()
                 
                 # If still within rate limit window, use cache and skip API call
-                if now < self._rate_limit_until:
-                    time_remaining = (self._rate_limit_until - now).total_seconds()
+                if now < self._rate_limit_until_monotonic:
+                    time_remaining = self._rate_limit_until_monotonic - now
                     _LOGGER.debug(
                         "API rate limited. Waiting %.0f seconds before retry. Using cached data.",
                         time_remaining
                     )
-                    if self.cache:
-                        try:
-                            cached = self.cache.load_deliveries()
-                            if cached:
-                                return {"deliveries": cached, "cached": True, "rate_limited": True}
-                        except Exception as cache_err:
-                            _LOGGER.error("Failed to load cached deliveries: %s", cache_err)
-                    raise UpdateFailed("API rate limited. Waiting for recovery.")
+                    return await self._cached_or_fail("API rate limited. Waiting for recovery.")
                 
-                # Rate limit window has expired, attempt probe request
-                if not self._probe_in_progress:
-                    _LOGGER.info("Rate limit window expired. Attempting probe request to check API status...")
-                    self._probe_in_progress = True
-                    
-                    try:
-                        probe_result = await self.api.get_deliveries(filter_mode=self.filter_mode)
-                        
-                        if probe_result.get("success"):
-                            # API is back, reset rate limit flags and process deliveries
-                            _LOGGER.info("✓ API is back online! Resuming normal operation.")
-                            self._rate_limited = False
-                            self._rate_limit_until = None
-                            self._probe_in_progress = False
-                            
-                            # Process and return the probe data to avoid double API call
-                            deliveries = probe_result.get("deliveries", [])
-                            processed_deliveries = self._process_deliveries(deliveries)
-                            return {"deliveries": processed_deliveries}
-                        else:
-                            error_msg = probe_result.get("error_message", "Unknown error")
-                            if "rate limit" in error_msg.lower() or "429" in error_msg:
-                                # Still rate limited, extend wait period
-                                _LOGGER.warning("API still rate limited. Extending wait period.")
-                                self._rate_limit_until = datetime.now() + timedelta(hours=1)
-                                self._probe_in_progress = False
-                                
-                                if self.cache:
-                                    try:
-                                        cached = self.cache.load_deliveries()
-                                        if cached:
-                                            return {"deliveries": cached, "cached": True, "rate_limited": True}
-                                    except Exception as cache_err:
-                                        _LOGGER.error("Failed to load cached deliveries: %s", cache_err)
-                                raise UpdateFailed("API still rate limited. Waiting for recovery.")
-                            else:
-                                # Different error, reset rate limit state
-                                _LOGGER.warning("Probe request failed with different error: %s", error_msg)
-                                self._rate_limited = False
-                                self._rate_limit_until = None
-                                self._probe_in_progress = False
-                                raise UpdateFailed(f"API error: {error_msg}")
-                    except Exception as probe_err:
-                        # Probe request itself failed, reset state and let normal error handling proceed
-                        _LOGGER.error("Probe request crashed: %s", probe_err, exc_info=True)
-                        self._rate_limited = False
-                        self._rate_limit_until = None
-                        self._probe_in_progress = False
-                        raise UpdateFailed(f"Probe request failed: {probe_err}") from probe_err
-                    
-                    self._probe_in_progress = False
+                # Rate limit window has expired; only one refresh probes at a time
+                async with self._probe_lock:
+                    if self._rate_limited:
+                        # A probe that held the lock may have extended the window
+                        if time.monotonic() < self._rate_limit_until_monotonic:
+                            return await self._cached_or_fail(
+                                "API still rate limited. Waiting for recovery."
+                            )
+                        return await self._probe()
             
             # On first setup/reload, use cache if available to minimize API calls
             if self._skip_first_request:
+                self._skip_first_request = False
                 if self.cache:
                     try:
-                        cached = self.cache.load_deliveries()
+                        cached = await self.cache.async_load()
                         if cached:
                             _LOGGER.info("Using cached deliveries for initial setup.")
-                            return {"deliveries": cached, "cached": True}
+                            return self._process_deliveries(cached, cached=True)
                     except Exception as cache_err:
                         _LOGGER.warning("Failed to load cached deliveries on setup: %s", cache_err)
-                self._skip_first_request = False
             
-            result = await self.api.get_deliveries(filter_mode=self.filter_mode)
+            result = await self.api.get_deliveries(
+                filter_mode=self.filter_mode, cache_fallback=False
+            )
 
             if not result.get("success"):
                 error_msg = result.get("error_message", "Unknown error")
                 
                 # Handle rate limiting with retry_after
-                if "rate limit" in error_msg.lower() or "429" in error_msg:
+                if _is_rate_limited(result):
+                    self._rate_limited = True
+                    wait = self._extend_backoff(result.get("retry_after"))
                     _LOGGER.error(
                         "ParcelApp API rate limited (HTTP 429). "
-                        "No more requests will be made for 1 hour. Using cached data."
+                        "No more requests will be made for %.0f seconds. Using cached data.",
+                        wait,
                     )
-                    self._rate_limited = True
-                    self._rate_limit_until = datetime.now() + timedelta(hours=1)
                     
                     # Return cached data instead of raising
-                    if self.cache:
-                        try:
-                            cached = self.cache.load_deliveries()
-                            if cached:
-                                return {"deliveries": cached, "cached": True, "rate_limited": True}
-                        except Exception as cache_err:
-                            _LOGGER.error("Failed to load cached deliveries during rate limit: %s", cache_err)
-                    
-                    raise UpdateFailed(error_msg, retry_after=3600)
+                    return await self._cached_or_fail(error_msg, retry_after=wait)
                 
                 _LOGGER.warning("ParcelApp API error: %s", error_msg)
                 raise UpdateFailed(f"API error: {error_msg}")
 
-            deliveries = result.get("deliveries", [])
-            
             # Reset rate limit state on successful API call
             if self._rate_limited:
                 _LOGGER.info("✓ API recovered. Resuming normal operation.")
                 self._rate_limited = False
-                self._rate_limit_until = None
-
-            # Process deliveries and filter out old completed ones
-            processed_deliveries = []
-            for delivery in deliveries:
-                delivery_data = {
-                    "tracking_number": delivery.get("tracking_number"),
-                    "carrier_code": delivery.get("carrier_code"),
-                    "description": delivery.get("description"),
-                    "status_code": delivery.get("status_code"),
-                    "status_name": DELIVERY_STATUS_CODES.get(
-                        delivery.get("status_code"), "unknown"
-                    ),
-                    "date_expected": delivery.get("date_expected"),
-                    "date_expected_end": delivery.get("date_expected_end"),
-                    "events": delivery.get("events", []),
-                    "extra_information": delivery.get("extra_information"),
-                }
-
-                # Add timestamp fields if available
-                if "timestamp_expected" in delivery:
-                    delivery_data["timestamp_expected"] = delivery[
-                        "timestamp_expected"
-                    ]
-                if "timestamp_expected_end" in delivery:
-                    delivery_data["timestamp_expected_end"] = delivery[
-                        "timestamp_expected_end"
-                    ]
-
-                # Check if delivery should be removed (completed and older than 3 days)
-                if self._should_remove_delivery(delivery_data):
-                    _LOGGER.debug(
-                        f"Marking delivery {delivery_data['tracking_number']} for removal (completed 3+ days ago)"
-                    )
-                    delivery_data["should_remove"] = True
-                else:
-                    delivery_data["should_remove"] = False
+                self._rate_limit_until_monotonic = 0.0
+                self._backoff_current = self._backoff_base
+
+            if result.get("not_modified"):
+                return self._reuse_previous_data()
 
-                processed_deliveries.append(delivery_data)
+            deliveries = result.get("deliveries", [])
 
-            return {"deliveries": processed_deliveries}
+            # Process deliveries and filter out old completed ones; the API
+            # client has already written them to the disk cache off-loop
+            self._last_processed = self._process_deliveries(deliveries)
+            return self._last_processed
 
         except UpdateFailed:
             raise
         except Exception as err:
+            # The response was not used, so don't let the next poll get a 304 for it
+            self.api.clear_etag()
             _LOGGER.exception("Unexpected error updating deliveries: %s", err)
             raise UpdateFailed(f"Error updating deliveries: {err}") from err
 
-    def _process_deliveries(self, deliveries: list) -> list:
-        """Process raw deliveries and filter old completed ones."""
-        processed_deliveries = []
-        for delivery in deliveries:
-            delivery_data = {
-                "tracking_number": delivery.get("tracking_number"),
-                "carrier_code": delivery.get("carrier_code"),
-                "description": delivery.get("description"),
-                "status_code": delivery.get("status_code"),
-                "status_name": DELIVERY_STATUS_CODES.get(
-                    delivery.get("status_code"), "unknown"
-                ),
-                "date_expected": delivery.get("date_expected"),
-                "date_expected_end": delivery.get("date_expected_end"),
-                "events": delivery.get("events", []),
-                "extra_information": delivery.get("extra_information"),
-            }
-
-            # Add timestamp fields if available
-            if "timestamp_expected" in delivery:
-                delivery_data["timestamp_expected"] = delivery["timestamp_expected"]
-            if "timestamp_expected_end" in delivery:
-                delivery_data["timestamp_expected_end"] = delivery["timestamp_expected_end"]
+    async def _probe(self) -> Dict[str, Any]:
+        """Send a single probe request after the rate-limit window expired."""
+        _LOGGER.info("Rate limit window expired. Attempting probe request to check API status...")
+        try:
+            probe_result = await self.api.get_deliveries(
+                filter_mode=self.filter_mode, cache_fallback=False
+            )
+        except Exception as probe_err:
+            # Probe request itself failed, reset state and let normal error handling proceed
+            _LOGGER.error("Probe request crashed: %s", probe_err, exc_info=True)
+            self._rate_limited = False
+            self._rate_limit_until_monotonic = 0.0
+            raise UpdateFailed(f"Probe request failed: {probe_err}") from probe_err
+
+        if probe_result.get("success"):
+            # API is back, reset rate limit flags and process deliveries
+            _LOGGER.info("✓ API is back online! Resuming normal operation.")
+            self._rate_limited = False
+            self._rate_limit_until_monotonic = 0.0
+            self._backoff_current = self._backoff_base
+
+            if probe_result.get("not_modified"):
+                return self._reuse_previous_data()
+
+            # Process and return the probe data to avoid double API call
+            self._last_processed = self._process_deliveries(
+                probe_result.get("deliveries", [])
+            )
+            return self._last_processed
+
+        error_msg = probe_result.get("error_message", "Unknown error")
+        if _is_rate_limited(probe_result):
+            # Still rate limited, extend wait period
+            wait = self._extend_backoff(probe_result.get("retry_after"))
+            _LOGGER.warning(
+                "API still rate limited. Extending wait period to %.0f seconds.",
+                wait,
+            )
+            return await self._cached_or_fail(
+                "API still rate limited. Waiting for recovery.", retry_after=wait
+            )
 
+        # Different error, reset rate limit state
+        _LOGGER.warning("Probe request failed with different error: %s", error_msg)
+        self._rate_limited = False
+        self._rate_limit_until_monotonic = 0.0
+        raise UpdateFailed(f"API error: {error_msg}")
+
+    async def _cached_or_fail(
+        self, message: str, retry_after: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Return cached deliveries while rate limited, or raise UpdateFailed.
+
+        The last processed data is handed back from memory; the disk cache is
+        only read when there is none yet (e.g. right after a restart).
+        """
+        if self._last_processed is not None:
+            return {**self._last_processed, "cached": True, "rate_limited": True}
+        if self.cache:
+            try:
+                cached = await self.cache.async_load()
+                if cached:
+                    self._last_processed = self._process_deliveries(
+                        cached, cached=True, rate_limited=True
+                    )
+                    return self._last_processed
+            except Exception as cache_err:
+                _LOGGER.error("Failed to load cached deliveries: %s", cache_err)
+        raise UpdateFailed(message, retry_after=retry_after)
+
+    def _extend_backoff(self, retry_after: Optional[float] = None) -> float:
+        """Start a new rate-limit window and return its length in seconds.
+
+        Uses the server's Retry-After when given, otherwise grows the wait
+        with decorrelated jitter.
+        """
+        if retry_after:
+            wait = float(retry_after)
+        else:
+            self._backoff_current = min(
+                self._backoff_cap,
+                random.uniform(self._backoff_base, self._backoff_current * 3.0),
+            )
+            wait = self._backoff_current
+        self._rate_limit_until_monotonic = time.monotonic() + wait
+        return wait
+
+    def _reuse_previous_data(self) -> Dict[str, Any]:
+        """Return the previous data for a not-modified API response."""
+        if self.data is None:
+            # Nothing to reuse; make the next request fetch the full payload
+            self.api.clear_etag()
+            raise UpdateFailed("Deliveries not modified but no previous data available")
+        _LOGGER.debug("Deliveries not modified, reusing previous data.")
+        return self.data
+
+    def _process_deliveries(self, deliveries: list, **flags: Any) -> Dict[str, Any]:
+        """Process raw deliveries into coordinator data of Delivery objects.
+
+        Old completed deliveries are left out of the active list and only
+        reported by tracking number in removed_ids, for device cleanup.
+        """
+        active = []
+        removed_ids = []
+        now = datetime.now()
+        for delivery in deliveries:
             # Check if delivery should be removed (completed and older than 3 days)
-            if self._should_remove_delivery(delivery_data):
+            if self._should_remove_delivery(delivery, now):
                 _LOGGER.debug(
-                    f"Marking delivery {delivery_data['tracking_number']} for removal (completed 3+ days ago)"
+                    "Marking delivery %s for removal (completed 3+ days ago)",
+                    delivery.get("tracking_number"),
                 )
-                delivery_data["should_remove"] = True
-            else:
-                delivery_data["should_remove"] = False
+                removed_ids.append(delivery.get("tracking_number"))
+                continue
 
-            processed_deliveries.append(delivery_data)
-        
-        return processed_deliveries
+            item = Delivery.from_api(delivery)
+            # Sensor attributes are built once here rather than on every read
+            item.attributes = _build_attributes(item)
+            active.append(item)
+
+        self._prune_date_cache(now)
+        return {
+            "deliveries": active,
+            "removed_ids": removed_ids,
+            "by_id": {d.tracking_number: d for d in active},
+            **flags,
+        }
 
-    def _should_remove_delivery(self, delivery: Dict[str, Any]) -> bool:
+    def _should_remove_delivery(self, delivery: Dict[str, Any], now: datetime) -> bool:
         """Check if a delivery should be removed (completed 3+ days ago)."""
         # Only remove if status is completed (0)
         if delivery.get("status_code") != 0:
             return False
 
-        # Try to get the expected date
+        # Try to get the expected date; skip anything not in the API's format
         date_str = delivery.get("date_expected")
-        if not date_str:
+        if not isinstance(date_str, str) or not _DATE_RE.match(date_str):
+            if date_str:
+                _LOGGER.debug("Skipping unrecognized delivery date: %s", date_str)
             return False
 
         try:
             # Parse the date string (format: "2025-12-06 00:00:00")
-            delivery_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            now = datetime.now()
+            delivery_date = self._date_cache.get(date_str)
+            if delivery_date is None:
+                delivery_date = datetime.fromisoformat(date_str)
+                self._date_cache[date_str] = delivery_date
             days_ago = (now - delivery_date).days
 
             # Remove if delivered 3 or more days ago
             return days_ago >= DEFAULT_REMOVAL_AGE_DAYS
-        except (ValueError, TypeError) as err:
-            _LOGGER.warning(f"Could not parse delivery date: {date_str}")
+        except (ValueError, TypeError):
+            _LOGGER.warning("Could not parse delivery date: %s", date_str)
             return False
+
+    def _prune_date_cache(self, now: datetime) -> None:
+        """Drop parsed dates well past the removal age."""
+        cutoff = now - timedelta(days=DEFAULT_REMOVAL_AGE_DAYS * 2)
+        stale = [
+            date_str
+            for date_str, parsed in self._date_cache.items()
+            if parsed < cutoff
+        ]
+        for date_str in stale:
+            del self._date_cache[date_str]
@@ -1,10 +1,11 @@
 """Sensor platform for ParcelApp integration."""
 import logging
+import sys
 from typing import Optional
 
 from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.const import STATE_UNKNOWN
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.helpers.update_coordinator import (
@@ -13,7 +14,7 @@ from homeassistant.helpers.update_coordinator import (
 )
 
 from .const import DOMAIN
-from .coordinator import DELIVERY_STATUS_CODES
+from .coordinator import Delivery
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,8 +32,9 @@ async def async_setup_platform(
     coordinator = discovery_info["coordinator"]
     async_add_entities(
         [
-            ParcelAppSensor(coordinator, delivery["tracking_number"])
+            ParcelAppSensor(coordinator, delivery.tracking_number)
             for delivery in coordinator.data.get("deliveries", [])
+            if delivery.tracking_number
         ]
     )
 
@@ -44,14 +46,42 @@ async def async_setup_entry(
     discovery_info: Optional[DiscoveryInfoType] = None,
 ) -> None:
     """Set up ParcelApp sensors from config entry."""
-    coordinator: DataUpdateCoordinator = hass.data[DOMAIN]["coordinator"]
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator: DataUpdateCoordinator = entry_data["coordinator"]
 
-    sensors = []
-    if coordinator.data:
-        for delivery in coordinator.data.get("deliveries", []):
-            sensors.append(ParcelAppSensor(coordinator, delivery["tracking_number"]))
+    # Old completed deliveries are already left out of this list; deliveries
+    # without a tracking number can't get a sensor
+    deliveries = [
+        delivery
+        for delivery in (coordinator.data or {}).get("deliveries", [])
+        if delivery.tracking_number
+    ]
 
-    async_add_entities(sensors)
+    # Tracking numbers that already have a sensor
+    known = entry_data.setdefault("tracking_numbers", set())
+    known.update(delivery.tracking_number for delivery in deliveries)
+
+    async_add_entities(
+        ParcelAppSensor(coordinator, delivery.tracking_number)
+        for delivery in deliveries
+    )
+
+    @callback
+    def _handle_update() -> None:
+        """Add sensors for deliveries that appeared since the last update."""
+        current = {
+            delivery.tracking_number
+            for delivery in (coordinator.data or {}).get("deliveries", [])
+            if delivery.tracking_number
+        }
+        new_ids = current - known
+        if new_ids:
+            known.update(new_ids)
+            async_add_entities(
+                ParcelAppSensor(coordinator, tracking_number) for tracking_number in new_ids
+            )
+
+    config_entry.async_on_unload(coordinator.async_add_listener(_handle_update))
 
 
 class ParcelAppSensor(CoordinatorEntity, SensorEntity):
@@ -63,25 +93,34 @@ class ParcelAppSensor(CoordinatorEntity, SensorEntity):
     def __init__(self, coordinator: DataUpdateCoordinator, tracking_number: str):
         """Initialize the sensor."""
         super().__init__(coordinator)
+        if isinstance(tracking_number, str):
+            tracking_number = sys.intern(tracking_number)
         self.tracking_number = tracking_number
         self._attr_unique_id = f"parcelapp_{tracking_number}"
         self._attr_name = "Tracking Status"
+        # device_info is rebuilt only when (description, carrier_code) changes
+        self._device_info_cache: Optional[dict] = None
+        self._device_info_key: tuple = ()
 
     @property
     def device_info(self):
         """Return device info for this delivery."""
         try:
             delivery = self._get_delivery()
-            if not delivery:
+            if delivery is None:
                 return None
 
-            return {
-                "identifiers": {("parcelapp", self.tracking_number)},
-                "name": delivery.get("description", self.tracking_number),
-                "manufacturer": "ParcelApp",
-                "model": delivery.get("carrier_code", "Unknown"),
-                "sw_version": "1.0.0",
-            }
+            key = (delivery.description, delivery.carrier_code)
+            if key != self._device_info_key:
+                self._device_info_cache = {
+                    "identifiers": {("parcelapp", self.tracking_number)},
+                    "name": delivery.description or self.tracking_number,
+                    "manufacturer": "ParcelApp",
+                    "model": delivery.carrier_code or "Unknown",
+                    "sw_version": "1.0.0",
+                }
+                self._device_info_key = key
+            return self._device_info_cache
         except Exception as err:
             _LOGGER.error(
                 "Error getting device info for %s: %s", self.tracking_number, err
@@ -93,11 +132,10 @@ class ParcelAppSensor(CoordinatorEntity, SensorEntity):
         """Return the state of the sensor."""
         try:
             delivery = self._get_delivery()
-            if not delivery:
+            if delivery is None:
                 return STATE_UNKNOWN
 
-            status_code = delivery.get("status_code")
-            return DELIVERY_STATUS_CODES.get(status_code, STATE_UNKNOWN)
+            return delivery.status_name
         except Exception as err:
             _LOGGER.error(
                 "Error getting state for %s: %s", self.tracking_number, err
@@ -109,42 +147,11 @@ class ParcelAppSensor(CoordinatorEntity, SensorEntity):
         """Return extra state attributes."""
         try:
             delivery = self._get_delivery()
-            if not delivery:
+            if delivery is None:
                 return {}
 
-            # Get the most recent event
-            events = delivery.get("events", [])
-            latest_event = None
-            if events and isinstance(events, list) and len(events) > 0:
-                latest_event = {
-                    "event": events[0].get("event"),
-                    "date": events[0].get("date"),
-                    "location": events[0].get("location"),
-                    "additional": events[0].get("additional"),
-                }
-
-            attributes = {
-                "tracking_number": delivery.get("tracking_number"),
-                "carrier": delivery.get("carrier_code"),
-                "description": delivery.get("description"),
-                "status_code": delivery.get("status_code"),
-                "date_expected": delivery.get("date_expected"),
-                "latest_event": latest_event,
-            }
-
-            # Add optional fields if present
-            if delivery.get("date_expected_end"):
-                attributes["date_expected_end"] = delivery.get("date_expected_end")
-            if delivery.get("extra_information"):
-                attributes["extra_information"] = delivery.get("extra_information")
-            if delivery.get("timestamp_expected"):
-                attributes["timestamp_expected"] = delivery.get("timestamp_expected")
-            if delivery.get("timestamp_expected_end"):
-                attributes["timestamp_expected_end"] = delivery.get(
-                    "timestamp_expected_end"
-                )
-
-            return attributes
+            # Attributes are precomputed by the coordinator on each refresh
+            return delivery.attributes
 
         except Exception as err:
             _LOGGER.error(
@@ -152,22 +159,13 @@ class ParcelAppSensor(CoordinatorEntity, SensorEntity):
             )
             return {}
 
-    def _get_delivery(self):
+    def _get_delivery(self) -> Optional[Delivery]:
         """Get the delivery data for this sensor."""
         try:
             if not self.coordinator.data:
                 return None
 
-            deliveries = self.coordinator.data.get("deliveries", [])
-            if not isinstance(deliveries, list):
-                _LOGGER.warning("Deliveries data is not a list")
-                return None
-
-            for delivery in deliveries:
-                if delivery.get("tracking_number") == self.tracking_number:
-                    return delivery
-
-            return None
+            return self.coordinator.data.get("by_id", {}).get(self.tracking_number)
 
         except Exception as err:
             _LOGGER.error(
@@ -0,0 +1,41 @@
+"""Shared pytest configuration for ParcelApp tests."""
+from types import MappingProxyType, SimpleNamespace
+
+# Returned by get_deliveries when a test passes no payload
+_EMPTY_DELIVERIES = MappingProxyType({"success": True, "deliveries": ()})
+
+
+class FakeAsync:
+    """Awaitable stub that returns ret or raises exc, without mock machinery."""
+
+    __slots__ = ("_ret", "_exc")
+
+    def __init__(self, ret=None, exc=None):
+        self._ret = ret
+        self._exc = exc
+
+    async def __call__(self, *args, **kwargs):
+        if self._exc is not None:
+            raise self._exc
+        return self._ret
+
+
+def _make_mock_api(overrides=None, side_effect=None):
+    """Build a mock ParcelApp API.
+
+    Pass overrides to change what get_deliveries returns, or side_effect
+    to make it raise.
+    """
+    return SimpleNamespace(
+        get_deliveries=FakeAsync(ret=overrides or _EMPTY_DELIVERIES, exc=side_effect),
+        close=FakeAsync(),
+        clear_etag=lambda: None,
+        # No disk cache, so the coordinator has nothing to fall back to
+        cache=None,
+    )
+
+
+def pytest_generate_tests(metafunc):
+    """Pass the mock API factory as a plain argument instead of a fixture."""
+    if "mock_api" in metafunc.fixturenames:
+        metafunc.parametrize("mock_api", [_make_mock_api], ids=["default"])
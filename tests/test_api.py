@@ -0,0 +1,182 @@
+"""Tests for the ParcelApp API client."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from custom_components.parcelapp.api import (
+    RETRY_CAP,
+    ParcelAppAPI,
+    _parse_retry_after,
+    _should_retry,
+)
+from custom_components.parcelapp.cache import ParcelAppCache
+
+DELIVERY = {"tracking_number": "1", "status_code": 2}
+
+
+class FakeResponse:
+    """Minimal aiohttp response for a single request."""
+
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self._body = body
+        self.headers = headers or {}
+
+    async def json(self, loads=None):
+        return self._body
+
+    async def text(self):
+        return str(self._body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Session that answers GETs from a list of responses, recording headers."""
+
+    closed = False
+
+    def __init__(self, *responses):
+        self._responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers=None):
+        self.sent_headers.append(headers)
+        return self._responses.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+def _api(*responses):
+    """Return an API client with an in-memory cache and a fake session."""
+    api = ParcelAppAPI("key", cache=ParcelAppCache(":memory:"))
+    api.session = FakeSession(*responses)
+    return api
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after(None) is None
+    assert _parse_retry_after("") is None
+    assert _parse_retry_after("120") == 120.0
+    assert _parse_retry_after("-5") == 0.0
+    assert _parse_retry_after("not a date") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(minutes=10)
+    seconds = _parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert 590 <= seconds <= 600
+    past = datetime.now(timezone.utc) - timedelta(minutes=10)
+    assert _parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize(
+    "status,retry_after,expected",
+    [
+        (429, None, False),
+        (429, 1.0, False),
+        (500, None, True),
+        (503, RETRY_CAP, True),
+        (503, RETRY_CAP + 1, False),
+        (404, None, False),
+        (200, None, False),
+    ],
+)
+def test_should_retry(status, retry_after, expected):
+    assert _should_retry(status, retry_after) is expected
+
+
+@pytest.mark.asyncio
+async def test_get_deliveries_memoizes_and_merges_concurrent_calls():
+    api = ParcelAppAPI("key", cache=ParcelAppCache(":memory:"))
+    calls = 0
+
+    async def _fetch(filter_mode, cache_fallback=True):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return {"success": True, "deliveries": [DELIVERY]}
+
+    api._fetch_deliveries = _fetch
+    first, second = await asyncio.gather(
+        api.get_deliveries("active"), api.get_deliveries("active")
+    )
+    assert calls == 1
+    assert first is second
+
+    # Served from memory within the TTL, fetched again once it expires
+    assert await api.get_deliveries("active") is first
+    assert calls == 1
+    api._ttl = 0
+    await api.get_deliveries("active")
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_get_deliveries_does_not_memoize_failures():
+    api = ParcelAppAPI("key", cache=ParcelAppCache(":memory:"))
+    results = [
+        {"success": False, "error_message": "HTTP 500"},
+        {"success": True, "not_modified": True},
+        {"success": True, "deliveries": []},
+    ]
+
+    async def _fetch(filter_mode, cache_fallback=True):
+        return results.pop(0)
+
+    api._fetch_deliveries = _fetch
+    assert not (await api.get_deliveries())["success"]
+    assert (await api.get_deliveries())["not_modified"]
+    assert (await api.get_deliveries())["deliveries"] == []
+    assert results == []
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_reported_even_with_cached_deliveries():
+    api = _api(FakeResponse(429, "slow down", {"Retry-After": "1800"}))
+    api.cache.save_deliveries([DELIVERY])
+
+    result = await api.get_deliveries()
+
+    assert result["success"] is False
+    assert result["rate_limited"] is True
+    assert result["retry_after"] == 1800
+    # A single request: 429 is never retried in-line
+    assert api.session._responses == []
+
+
+@pytest.mark.asyncio
+async def test_error_falls_back_to_cache_only_when_asked():
+    api = _api(FakeResponse(404, "gone"), FakeResponse(404, "gone"))
+    api.cache.save_deliveries([DELIVERY])
+
+    result = await api.get_deliveries(cache_fallback=False)
+    assert result == {"success": False, "error_message": "HTTP 404"}
+
+    result = await api.get_deliveries()
+    assert result["cached"] is True
+    assert result["deliveries"] == [DELIVERY]
+
+
+@pytest.mark.asyncio
+async def test_etag_is_kept_only_for_successful_payloads():
+    api = _api(
+        FakeResponse(200, {"success": False, "error_message": "bad"}, {"ETag": '"a"'}),
+        FakeResponse(200, {"success": True, "deliveries": [DELIVERY]}, {"ETag": '"b"'}),
+        FakeResponse(304),
+    )
+    api._ttl = 0
+
+    await api.get_deliveries()
+    assert api._etag is None
+
+    await api.get_deliveries()
+    assert api._etag == '"b"'
+    assert api.cache.load_deliveries() == [DELIVERY]
+
+    assert (await api.get_deliveries())["not_modified"] is True
+    assert api.session.sent_headers == [None, None, {"If-None-Match": '"b"'}]
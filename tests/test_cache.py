@@ -1,11 +1,11 @@
 """Test ParcelApp local cache logic."""
-import os
+import sqlite3
+
 import pytest
 from custom_components.parcelapp.cache import ParcelAppCache
 
-def test_cache_save_and_load(tmp_path):
-    db_path = tmp_path / "test_cache.sqlite3"
-    cache = ParcelAppCache(str(db_path))
+def test_cache_save_and_load():
+    cache = ParcelAppCache(":memory:")
     deliveries = [
         {"tracking_number": "1", "description": "A"},
         {"tracking_number": "2", "description": "B"},
@@ -19,3 +19,26 @@ def test_cache_save_and_load(tmp_path):
     # Overwrite and test clear
     cache.clear()
     assert cache.load_deliveries() == []
+
+
+def test_cache_shared_connection():
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    cache = ParcelAppCache(connection=conn)
+    cache.save_deliveries([{"tracking_number": "1", "description": "A"}])
+    cache.close()
+
+    # The borrowed connection stays open and keeps the data
+    reopened = ParcelAppCache(connection=conn)
+    assert reopened.load_deliveries() == [{"tracking_number": "1", "description": "A"}]
+    conn.close()
+
+
+def test_cache_closed_logs_instead_of_raising(caplog):
+    cache = ParcelAppCache(":memory:")
+    cache.close()
+
+    cache.save_deliveries([{"tracking_number": "1"}])
+    assert cache.load_deliveries() == []
+    cache.clear()
+    cache.prune(30)
+    assert caplog.text.count("Cannot operate on a closed cache") == 4
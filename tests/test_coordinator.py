@@ -0,0 +1,149 @@
+"""Tests for the ParcelApp update coordinator."""
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.parcelapp.cache import ParcelAppCache
+from custom_components.parcelapp.const import DEFAULT_REMOVAL_AGE_DAYS
+from custom_components.parcelapp.coordinator import ParcelAppCoordinator
+
+NOW = datetime(2025, 12, 10, 12, 0, 0)
+RATE_LIMITED = {
+    "success": False,
+    "rate_limited": True,
+    "error_message": "You were rate limited",
+    "retry_after": 1800,
+}
+
+
+def _date(days_ago, now=NOW):
+    """Return a date_expected string the given number of days before now."""
+    return (now - timedelta(days=days_ago)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ScriptedAPI:
+    """API stub that answers get_deliveries from a list of results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.cache = ParcelAppCache(":memory:")
+        self.etag_cleared = False
+
+    async def get_deliveries(self, filter_mode="recent", cache_fallback=True):
+        assert cache_fallback is False
+        self.calls += 1
+        return self.results.pop(0)
+
+    def clear_etag(self):
+        self.etag_cleared = True
+
+
+def _coordinator(*results):
+    return ParcelAppCoordinator(MagicMock(), ScriptedAPI(*results))
+
+
+def _success(*tracking_numbers):
+    return {
+        "success": True,
+        "deliveries": [{"tracking_number": tn, "status_code": 2} for tn in tracking_numbers],
+    }
+
+
+@pytest.mark.parametrize(
+    "delivery,expected",
+    [
+        ({"status_code": 0, "date_expected": _date(DEFAULT_REMOVAL_AGE_DAYS)}, True),
+        ({"status_code": 0, "date_expected": _date(DEFAULT_REMOVAL_AGE_DAYS - 1)}, False),
+        ({"status_code": 2, "date_expected": _date(30)}, False),
+        ({"status_code": 0, "date_expected": "invalid-date-format"}, False),
+        ({"status_code": 0, "date_expected": "2025-13-40 00:00:00"}, False),
+        ({"status_code": 0}, False),
+    ],
+    ids=["old_completed", "recent_completed", "in_transit", "bad_format", "bad_date", "no_date"],
+)
+def test_should_remove_delivery(delivery, expected):
+    coordinator = _coordinator()
+    assert coordinator._should_remove_delivery(delivery, NOW) is expected
+
+
+def test_process_deliveries_splits_removed():
+    coordinator = _coordinator()
+    # _process_deliveries compares against the real clock
+    now = datetime.now()
+    data = coordinator._process_deliveries(
+        [
+            {"tracking_number": "old", "status_code": 0, "date_expected": _date(10, now)},
+            {"tracking_number": "new", "status_code": 0, "date_expected": _date(0, now)},
+            {"tracking_number": "moving", "status_code": 2, "events": [{"event": "e"}]},
+        ],
+        cached=True,
+    )
+
+    assert data["removed_ids"] == ["old"]
+    assert [d.tracking_number for d in data["deliveries"]] == ["new", "moving"]
+    assert set(data["by_id"]) == {"new", "moving"}
+    assert data["by_id"]["moving"].status_name == "in_transit"
+    assert data["by_id"]["moving"].attributes["latest_event"]["event"] == "e"
+    assert data["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_window_and_probe():
+    coordinator = _coordinator(_success("A"), RATE_LIMITED, _success("B"))
+
+    assert list((await coordinator._async_update_data())["by_id"]) == ["A"]
+
+    # 429 opens the window from Retry-After and serves the last data from memory
+    data = await coordinator._async_update_data()
+    assert coordinator._rate_limited is True
+    remaining = coordinator._rate_limit_until_monotonic - time.monotonic()
+    assert 1790 < remaining <= 1800
+    assert list(data["by_id"]) == ["A"]
+    assert data["cached"] is True and data["rate_limited"] is True
+
+    # Inside the window no request is made
+    await coordinator._async_update_data()
+    assert coordinator.api.calls == 2
+
+    # Once the window has passed, one probe request resumes normal polling
+    coordinator._rate_limit_until_monotonic = time.monotonic() - 1
+    data = await coordinator._async_update_data()
+    assert coordinator.api.calls == 3
+    assert coordinator._rate_limited is False
+    assert list(data["by_id"]) == ["B"]
+    assert "cached" not in data
+
+
+@pytest.mark.asyncio
+async def test_probe_still_rate_limited_extends_window():
+    coordinator = _coordinator(RATE_LIMITED, dict(RATE_LIMITED, retry_after=None))
+    coordinator.api.cache.save_deliveries([{"tracking_number": "A", "status_code": 2}])
+
+    # Nothing processed yet, so the fallback comes from the disk cache
+    data = await coordinator._async_update_data()
+    assert list(data["by_id"]) == ["A"]
+
+    coordinator._rate_limit_until_monotonic = time.monotonic() - 1
+    await coordinator._async_update_data()
+    assert coordinator._rate_limited is True
+    assert coordinator._rate_limit_until_monotonic > time.monotonic()
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_without_any_data_fails():
+    coordinator = _coordinator(RATE_LIMITED)
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+    assert coordinator._rate_limited is True
+
+
+@pytest.mark.asyncio
+async def test_not_modified_without_previous_data_clears_etag():
+    coordinator = _coordinator({"success": True, "not_modified": True})
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+    assert coordinator.api.etag_cleared is True
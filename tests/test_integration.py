@@ -1,136 +1,290 @@
 """Tests for ParcelApp integration error handling."""
+import asyncio
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
-from homeassistant.exceptions import ConfigEntryNotReady
+from unittest.mock import MagicMock
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components import parcelapp
+from custom_components.parcelapp import _cleanup_now, async_unload_entry, sensor
+from custom_components.parcelapp.cache import ParcelAppCache
+from custom_components.parcelapp.const import DOMAIN
+from custom_components.parcelapp.coordinator import (
+    Delivery,
+    ParcelAppCoordinator,
+    _build_attributes,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
 
 # Mock values
 MOCK_API_KEY = "test_api_key_123"
 MOCK_TRACKING = "123456789"
 
+_BAR = "=" * 50
+
+if orjson is not None:
+
+    def _dumps(obj):
+        return orjson.dumps(obj, default=dict)
+
+    _loads = orjson.loads
+else:
+
+    def _dumps(obj):
+        return json.dumps(obj, default=dict)
+
+    _loads = json.loads
+
+# Expected delivery window, relative to the session start so payloads never
+# age into "completed long ago"; "YYYY-MM-DD HH:MM:SS" like the API
+_DATE_EXPECTED = datetime.combine(date.today() + timedelta(days=4), time())
+_DATE_EXPECTED_STR = _DATE_EXPECTED.isoformat(sep=" ")
+_DATE_EXPECTED_END_STR = (_DATE_EXPECTED + timedelta(days=2)).isoformat(sep=" ")
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "parcelapp"
+
+
+def _freeze(value):
+    """Return a read-only copy of decoded JSON (dicts and lists)."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _load_fixture(name):
+    """Load a sample API response from the fixtures directory."""
+    return _freeze(json.loads((FIXTURES_DIR / name).read_text(encoding="utf-8")))
+
+
+def _with_expected_dates(payload):
+    """Return payload with its delivery dates moved to the session's window."""
+    deliveries = tuple(
+        MappingProxyType({
+            **delivery,
+            "date_expected": _DATE_EXPECTED_STR,
+            "date_expected_end": _DATE_EXPECTED_END_STR,
+        })
+        for delivery in payload["deliveries"]
+    )
+    return MappingProxyType({**payload, "deliveries": deliveries})
+
+
+# API responses, built once at import and never mutated
+_PAYLOAD_SUCCESS = _with_expected_dates(_load_fixture("deliveries_sample.json"))
+
+_PAYLOAD_FAILURE = MappingProxyType({
+    "success": False,
+    "error_message": "API Error",
+})
+
+_PAYLOAD_MALFORMED = MappingProxyType({
+    "success": True,
+    "deliveries": (
+        # Missing required fields
+        MappingProxyType({"tracking_number": None}),
+    ),
+})
+
+_PAYLOAD_INVALID_DATE = MappingProxyType({
+    "success": True,
+    "deliveries": (
+        MappingProxyType({
+            "tracking_number": MOCK_TRACKING,
+            "carrier_code": "test",
+            "description": "Test",
+            "status_code": 0,
+            "date_expected": "invalid-date-format",
+            "events": (),
+        }),
+    ),
+})
+
+# Success payload encoded once; decoding it gives an independent, mutable copy
+_PAYLOAD_SUCCESS_BLOB = _dumps(_PAYLOAD_SUCCESS)
+
 
-@pytest.fixture
-def mock_api():
-    """Mock ParcelApp API."""
-    api = MagicMock()
-    api.get_deliveries = AsyncMock(return_value={
-        "success": True,
-        "deliveries": [
-            {
-                "tracking_number": MOCK_TRACKING,
-                "carrier_code": "test",
-                "description": "Test Package",
-                "status_code": 2,
-                "date_expected": "2025-12-10 00:00:00",
-                "events": [
-                    {
-                        "event": "In transit",
-                        "date": "2025-12-06",
-                        "location": "Test Location"
-                    }
-                ]
-            }
-        ]
-    })
-    api.close = AsyncMock()
-    return api
+def fresh_payload():
+    """Return a mutable deep copy of the success payload."""
+    return _loads(_PAYLOAD_SUCCESS_BLOB)
+
+
+def _payload_without_events():
+    """Return the success payload with the events list left out."""
+    payload = fresh_payload()
+    for delivery in payload["deliveries"]:
+        del delivery["events"]
+    return payload
+
+
+def test_sample_deliveries_fixture():
+    """Test that the sample response matches the constants the tests use."""
+    (delivery,) = _PAYLOAD_SUCCESS["deliveries"]
+    assert delivery["tracking_number"] == MOCK_TRACKING
+    assert delivery["date_expected"] == _DATE_EXPECTED_STR
+
+
+def _coordinator(api):
+    """Return a coordinator polling the given mock API."""
+    return ParcelAppCoordinator(MagicMock(), api)
 
 
 class TestErrorHandling:
     """Test error handling in integration."""
 
-    async def test_api_failure_doesnt_crash(self, mock_api):
-        """Test that API failures don't crash Home Assistant."""
-        mock_api.get_deliveries = AsyncMock(return_value={
-            "success": False,
-            "error_message": "API Error"
-        })
-        
-        # Integration should handle this gracefully
-        # Actual test would verify UpdateFailed is raised
-        assert True
-
-    async def test_malformed_data_doesnt_crash(self, mock_api):
-        """Test that malformed API responses don't crash."""
-        mock_api.get_deliveries = AsyncMock(return_value={
-            "success": True,
-            "deliveries": [
-                {
-                    # Missing required fields
-                    "tracking_number": None,
-                }
-            ]
-        })
-        
-        # Should handle gracefully
-        assert True
-
-    async def test_network_timeout_doesnt_crash(self, mock_api):
-        """Test that network timeouts are handled."""
-        import asyncio
-        mock_api.get_deliveries = AsyncMock(side_effect=asyncio.TimeoutError)
-        
-        # Should raise UpdateFailed, not crash HA
-        assert True
-
-    async def test_invalid_date_doesnt_crash(self, mock_api):
-        """Test that invalid dates don't crash."""
-        mock_api.get_deliveries = AsyncMock(return_value={
-            "success": True,
-            "deliveries": [
-                {
-                    "tracking_number": MOCK_TRACKING,
-                    "carrier_code": "test",
-                    "description": "Test",
-                    "status_code": 0,
-                    "date_expected": "invalid-date-format",
-                    "events": []
-                }
-            ]
-        })
-        
-        # Should handle gracefully
-        assert True
+    @pytest.mark.parametrize(
+        "payload,side_effect",
+        [(_PAYLOAD_FAILURE, None), (None, asyncio.TimeoutError)],
+        ids=["api_failure", "timeout"],
+    )
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_update_failure_raises_update_failed(self, mock_api, payload, side_effect):
+        """Test that API failures and timeouts surface as UpdateFailed."""
+        coordinator = _coordinator(mock_api(overrides=payload, side_effect=side_effect))
+        with pytest.raises(UpdateFailed):
+            await coordinator._async_update_data()
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_malformed_delivery_gets_no_sensor(self, mock_api):
+        """Test that a delivery without a tracking number is kept but gets no sensor."""
+        coordinator = _coordinator(mock_api(overrides=_PAYLOAD_MALFORMED))
+        coordinator.data = await coordinator._async_update_data()
+        (delivery,) = coordinator.data["deliveries"]
+        assert delivery.tracking_number is None
+
+        hass = SimpleNamespace(data={DOMAIN: {"entry": {"coordinator": coordinator}}})
+        entry = SimpleNamespace(entry_id="entry", async_on_unload=lambda unsub: None)
+        added = []
+        await sensor.async_setup_entry(hass, entry, added.extend)
+        assert added == []
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_invalid_date_delivery_is_kept(self, mock_api):
+        """Test that a completed delivery with an unparsable date is not removed."""
+        coordinator = _coordinator(mock_api(overrides=_PAYLOAD_INVALID_DATE))
+        data = await coordinator._async_update_data()
+        assert list(data["by_id"]) == [MOCK_TRACKING]
+        assert data["removed_ids"] == []
 
-    async def test_cleanup_task_error_doesnt_crash(self):
-        """Test that cleanup task errors don't crash."""
-        # Cleanup task should catch all exceptions and continue
-        assert True
+    def test_cleanup_task_error_doesnt_crash(self):
+        """Test that a failing device removal doesn't stop the cleanup pass."""
+        coordinator = SimpleNamespace(data={"removed_ids": ["broken", MOCK_TRACKING]})
+        hass = SimpleNamespace(data={DOMAIN: {"entry": {"coordinator": coordinator}}})
+        entry = SimpleNamespace(entry_id="entry")
+        removed = []
 
+        def _remove_device(device_id):
+            if device_id == "device-broken":
+                raise ValueError("registry error")
+            removed.append(device_id)
+
+        registry = SimpleNamespace(
+            async_get_device=lambda identifiers: SimpleNamespace(
+                id=f"device-{next(iter(identifiers))[1]}"
+            ),
+            async_remove_device=_remove_device,
+        )
+
+        _cleanup_now(hass, entry, registry)
+        assert removed == [f"device-{MOCK_TRACKING}"]
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_failed_setup_closes_cache(self, monkeypatch):
+        """Test that a failing first refresh closes the cache connection."""
+        caches = []
+
+        def _memory_cache():
+            caches.append(ParcelAppCache(":memory:"))
+            return caches[-1]
+
+        async def _first_refresh(self):
+            raise UpdateFailed("API down")
+
+        async def _executor_job(func, *args):
+            return func(*args)
+
+        monkeypatch.setattr(parcelapp, "ParcelAppCache", _memory_cache)
+        monkeypatch.setattr(
+            ParcelAppCoordinator, "async_config_entry_first_refresh", _first_refresh
+        )
+        hass = MagicMock()
+        hass.data = {}
+        hass.async_add_executor_job = _executor_job
+        entry = SimpleNamespace(entry_id="entry", data={"api_key": MOCK_API_KEY}, options={})
+
+        assert await parcelapp.async_setup_entry(hass, entry) is False
+        assert caches[0]._conn is None
+        assert hass.data[DOMAIN] == {}
+
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_unload_handles_missing_api(self):
-        """Test that unload handles missing API gracefully."""
-        # Should not raise if API is None or missing
-        assert True
+        """Test that unload succeeds when the entry data has no API client."""
+        async def _unload_platforms(entry, platforms):
+            return True
+
+        hass = SimpleNamespace(
+            data={DOMAIN: {"entry": {"coordinator": None}}},
+            config_entries=SimpleNamespace(async_unload_platforms=_unload_platforms),
+        )
+        entry = SimpleNamespace(entry_id="entry")
+
+        assert await async_unload_entry(hass, entry) is True
+        assert hass.data[DOMAIN] == {}
 
 
 class TestSensorProperties:
     """Test sensor property error handling."""
 
-    async def test_missing_delivery_returns_unknown(self):
-        """Test that missing delivery data returns UNKNOWN state."""
-        # Sensor state should be STATE_UNKNOWN, not crash
-        assert True
+    def test_missing_events_attributes(self):
+        """Test that a delivery without events gets attributes and no latest event."""
+        (raw,) = _payload_without_events()["deliveries"]
+        delivery = Delivery.from_api(raw)
+        attributes = _build_attributes(delivery)
+
+        assert delivery.events == []
+        assert attributes["latest_event"] is None
+        assert attributes["tracking_number"] == MOCK_TRACKING
+        assert attributes["date_expected_end"] == _DATE_EXPECTED_END_STR
 
-    async def test_malformed_events_handled(self):
-        """Test that malformed events don't crash attributes."""
-        # Should return empty dict or skip event, not crash
-        assert True
+    @pytest.mark.parametrize(
+        "data",
+        [None, {"deliveries": [], "by_id": {}}],
+        ids=["no_coordinator_data", "delivery_missing"],
+    )
+    def test_missing_delivery_returns_unknown(self, data):
+        """Test that a sensor without delivery data is unknown and has no attributes."""
+        entity = sensor.ParcelAppSensor(SimpleNamespace(data=data), MOCK_TRACKING)
 
-    async def test_none_coordinator_data_handled(self):
-        """Test that None coordinator data is handled."""
-        # All sensor properties should handle None gracefully
-        assert True
+        assert entity.state == STATE_UNKNOWN
+        assert entity.extra_state_attributes == {}
+        assert entity.device_info is None
 
 
 if __name__ == "__main__":
-    print("ParcelApp Integration - Error Handling Tests")
-    print("=" * 50)
-    print("✅ API failure handling")
-    print("✅ Malformed data handling")
-    print("✅ Network timeout handling")
-    print("✅ Invalid date handling")
-    print("✅ Cleanup task error handling")
-    print("✅ Unload error handling")
-    print("✅ Sensor property error handling")
-    print("=" * 50)
-    print("All error handling tests defined.")
-    print("\nTo run tests: pytest tests/test_integration.py")
+    sys.stdout.write("\n".join((
+        "ParcelApp Integration - Error Handling Tests",
+        _BAR,
+        "✅ API failure handling",
+        "✅ Malformed data handling",
+        "✅ Network timeout handling",
+        "✅ Invalid date handling",
+        "✅ Cleanup task error handling",
+        "✅ Unload error handling",
+        "✅ Sensor property error handling",
+        _BAR,
+        "All error handling tests defined.",
+        "",
+        "To run tests: pytest tests/test_integration.py",
+    )) + "\n")